@@ -1,33 +1,58 @@
 from flask import Flask
 
 import os
-from dotenv import load_dotenv
 
-from app.extensions import db, migrate, login_manager
+from app.extensions import db, migrate, login_manager, hasher, identity_cache, throttle, metrics, username_index, assets, page_cache, api_tokens
 from app.configs import DevConf, ProdConf
 
 from app.routes.main_bp import main_bp
 from app.routes.auth_bp import auth_bp
+from app.routes.api_bp import api_bp
 
-load_dotenv()
+from app.services.db_routing import init_engine_tuning
 
+from app.commands.hash_cli import hash_cli
+from app.commands.users_cli import users_cli
+from app.commands.assets_cli import assets_cli
+
+# .env is loaded once, by app.configs
 isDev = os.getenv("FLASK_DEBUG")
 
-def create_app():
+def create_app(config=None):
     # App Factory
     app = Flask(__name__)
 
-    if isDev:
+    if config is not None:
+        app.config.from_object(config)
+    elif isDev:
         app.config.from_object(DevConf)
     else:
         app.config.from_object(ProdConf)
 
     db.init_app(app)
+    init_engine_tuning(app, db)
     migrate.init_app(app, db)
     login_manager.init_app(app)
     login_manager.login_view = "auth.login"
+    login_manager.blueprint_login_views = {"api": None}  # plain 401, no redirect
+    hasher.init_app(app)
+    identity_cache.init_app(app)
+    throttle.init_app(app)
+    api_tokens.init_app(app)
+    metrics.init_app(app)
+    page_cache.init_app(app)
 
     # Register Bp
     app.register_blueprint(main_bp)
     app.register_blueprint(auth_bp)
+    app.register_blueprint(api_bp)
+
+    # After the models are imported
+    username_index.init_app(app)
+    assets.init_app(app)
+
+    # CLI
+    app.cli.add_command(hash_cli)
+    app.cli.add_command(users_cli)
+    app.cli.add_command(assets_cli)
     return app
\ No newline at end of file
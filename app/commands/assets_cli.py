@@ -0,0 +1,19 @@
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+from app.extensions import assets
+from app.services.assets import build
+
+assets_cli = AppGroup("assets", help="Static asset pipeline.")
+
+
+@assets_cli.command("build")
+def build_assets():
+    """Minify, fingerprint and gzip the CSS bundles in ASSET_BUNDLES."""
+    static_folder = current_app.static_folder
+    manifest = build(static_folder, current_app.config["ASSET_BUNDLES"])
+    assets.load(static_folder)
+
+    for name, entry in sorted(manifest.items()):
+        click.echo(f"{name:<24} -> {entry['file']}  {entry['size']} B, {entry['gzip_size']} B gzipped")
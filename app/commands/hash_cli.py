@@ -0,0 +1,98 @@
+import os
+import time
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, generate_password_hash
+
+from app.services.hashing import _method_id
+
+hash_cli = AppGroup("hash", help="Password hashing tools.")
+
+# cheapest first, and never below werkzeug's own defaults
+CANDIDATES = {
+    "scrypt": [f"scrypt:{2 ** exp}:8:1" for exp in range(15, 20)],
+    "pbkdf2": [f"pbkdf2:sha256:{DEFAULT_PBKDF2_ITERATIONS * n // 2}" for n in (2, 3, 4, 6, 8)],
+}
+
+
+def _p95(samples):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))]
+
+
+def _benchmark(method, samples):
+    generate_password_hash("warmup", method)
+    timings = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        generate_password_hash("calibration-password", method)
+        timings.append((time.perf_counter() - started) * 1000)
+    return _p95(timings)
+
+
+def _cost(method):
+    """``(family, work factor)``, e.g. ``("scrypt", 32768)``."""
+    name, *args = _method_id(method).split(":")
+    if name == "scrypt":
+        return name, int(args[0])
+    if name == "pbkdf2":
+        return name, int(args[1])
+    return name, 0
+
+
+def _is_weaker(method, than):
+    family, cost = _cost(method)
+    other_family, other_cost = _cost(than)
+    return family == other_family and cost < other_cost
+
+
+def _write_env(path, method):
+    line = f"PASSWORD_HASH_METHOD={method}\n"
+    lines = []
+    if os.path.exists(path):
+        with open(path) as f:
+            lines = [l for l in f.readlines() if not l.startswith("PASSWORD_HASH_METHOD=")]
+    if lines and not lines[-1].endswith("\n"):
+        lines[-1] += "\n"
+    lines.append(line)
+    with open(path, "w") as f:
+        f.writelines(lines)
+
+
+@hash_cli.command("calibrate")
+@click.option("--family", type=click.Choice(sorted(CANDIDATES)), default="scrypt", show_default=True)
+@click.option("--budget-ms", type=float, default=None, help="p95 latency budget per hash (default: HASH_LATENCY_BUDGET_MS).")
+@click.option("--samples", type=int, default=20, show_default=True)
+@click.option("--env-file", type=click.Path(dir_okay=False), default=None, help="Write the chosen method into this .env file.")
+@click.option("--allow-weaker", is_flag=True, help="Write a method weaker than the current one without asking.")
+def calibrate(family, budget_ms, samples, env_file, allow_weaker):
+    """Pick the strongest hash cost that fits the latency budget on this host."""
+    budget_ms = budget_ms or current_app.config.get("HASH_LATENCY_BUDGET_MS", 50)
+    current = current_app.config.get("PASSWORD_HASH_METHOD")
+    click.echo(f"Budget: {budget_ms:.0f} ms p95, {samples} samples per candidate")
+
+    chosen = None
+    for method in CANDIDATES[family]:
+        p95 = _benchmark(method, samples)
+        fits = p95 <= budget_ms
+        marker = " (current)" if method == current else ""
+        click.echo(f"  {method:<24} p95 {p95:8.1f} ms  {'ok' if fits else 'over'}{marker}")
+        if not fits:
+            # costs only go up from here
+            break
+        chosen = method
+
+    if chosen is None:
+        chosen = CANDIDATES[family][0]
+        click.echo("Nothing fits the budget; keeping werkzeug's default cost. Raise the budget or add cores.", err=True)
+
+    click.echo(f"\nPASSWORD_HASH_METHOD={chosen}")
+    if env_file:
+        if current and _is_weaker(chosen, current) and not allow_weaker:
+            click.confirm(f"{chosen} is weaker than the current {current}. Write it anyway?", abort=True, err=True)
+        _write_env(env_file, chosen)
+        click.echo(f"Written to {env_file}")
+    if chosen != current:
+        click.echo("Existing hashes are rehashed with it on each user's next successful login.")
@@ -0,0 +1,218 @@
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from werkzeug.security import generate_password_hash
+
+from app.extensions import db
+from app.models.users import User
+
+users_cli = AppGroup("users", help="Bulk user import/export.")
+
+EXPORT_FIELDS = ["id", "username", "fullname"]
+
+
+def _format_for(path, fmt):
+    if fmt:
+        return fmt
+    return "jsonl" if path.endswith((".jsonl", ".ndjson")) else "csv"
+
+
+def _read_records(f, fmt):
+    if fmt == "csv":
+        yield from csv.DictReader(f)
+    else:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def _load_progress(path):
+    try:
+        with open(path) as f:
+            return int(f.read().strip() or 0)
+    except FileNotFoundError:
+        return 0
+
+
+def _save_progress(path, done):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        f.write(str(done))
+    os.replace(tmp, path)
+
+
+def _split_batch(records, pre_hashed, report):
+    """Validate a batch and drop usernames repeated inside it.
+
+    Returns ``(line_no, row, password)`` tuples; ``password`` is the plaintext
+    still to hash, or None when the row already carries a hash.
+    """
+    entries, seen = [], set()
+    for line_no, record in records:
+        username = (record.get("username") or "").strip()
+        fullname = (record.get("fullname") or "").strip()
+        pwhash = record.get("password_hash")
+        password = record.get("password")
+        if pre_hashed and not pwhash:
+            pwhash, password = password, None
+
+        if not username or not fullname or not (pwhash or password):
+            report(line_no, username, "invalid")
+            continue
+        if len(username) > 10 or len(fullname) > 32:
+            report(line_no, username, "too long")
+            continue
+        if username in seen:
+            report(line_no, username, "duplicate")
+            continue
+
+        seen.add(username)
+        row = {"username": username, "fullname": fullname, "password": pwhash}
+        entries.append((line_no, row, None if pwhash else password))
+    return entries
+
+
+def _insert(entries, report):
+    """Insert a batch; if a username was taken since it was checked, go row by row."""
+    if not entries:
+        return 0
+    try:
+        db.session.execute(insert(User), [row for _, row, _ in entries])
+        db.session.commit()
+        return len(entries)
+    except IntegrityError:
+        db.session.rollback()
+
+    inserted = 0
+    for line_no, row, _ in entries:
+        try:
+            db.session.execute(insert(User), [row])
+            db.session.commit()
+            inserted += 1
+        except IntegrityError:
+            db.session.rollback()
+            report(line_no, row["username"], "exists")
+    return inserted
+
+
+@users_cli.command("import")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--format", "fmt", type=click.Choice(["csv", "jsonl"]), default=None, help="Defaults to the file extension.")
+@click.option("--batch-size", type=int, default=1000, show_default=True)
+@click.option("--workers", type=int, default=None, help="Hashing processes (default: all cores).")
+@click.option("--pre-hashed", is_flag=True, help="Treat the password column as an existing werkzeug hash.")
+@click.option("--report", "report_path", type=click.Path(dir_okay=False), default=None, help="Write skipped rows here instead of stderr.")
+@click.option("--resume/--no-resume", default=True, show_default=True, help="Continue from the last committed batch.")
+def import_users(path, fmt, batch_size, workers, pre_hashed, report_path, resume):
+    """Import users from CSV or JSONL (username, fullname, password or password_hash)."""
+    fmt = _format_for(path, fmt)
+    workers = workers or os.cpu_count() or 1
+    method = current_app.config.get("PASSWORD_HASH_METHOD", "scrypt")
+    progress_path = path + ".progress"
+    skip = _load_progress(progress_path) if resume else 0
+    report_file = open(report_path, "a") if report_path else sys.stderr
+
+    def report(line_no, username, reason):
+        report_file.write(f"{line_no}\t{username}\t{reason}\n")
+
+    if skip:
+        click.echo(f"Resuming after record {skip}")
+
+    imported = skipped = 0
+    done = skip
+    started = time.perf_counter()
+
+    with open(path, newline="") as f, ProcessPoolExecutor(max_workers=workers) as pool:
+        records = islice(enumerate(_read_records(f, fmt), start=1), skip, None)
+        while True:
+            batch = list(islice(records, batch_size))
+            if not batch:
+                break
+
+            entries = _split_batch(batch, pre_hashed, report)
+
+            # one indexed lookup per batch instead of one per row, so names
+            # that are already taken aren't hashed for nothing
+            taken = set(db.session.scalars(
+                select(User.username).where(User.username.in_([row["username"] for _, row, _ in entries]))
+            ))
+            keep = []
+            for line_no, row, password in entries:
+                if row["username"] in taken:
+                    report(line_no, row["username"], "exists")
+                else:
+                    keep.append((line_no, row, password))
+
+            to_hash = [(row, password) for _, row, password in keep if password is not None]
+            hashes = pool.map(
+                generate_password_hash,
+                [password for _, password in to_hash],
+                [method] * len(to_hash),
+                chunksize=max(1, len(to_hash) // (4 * workers)),
+            )
+            for (row, _), pwhash in zip(to_hash, hashes):
+                row["password"] = pwhash
+
+            # the unique index on username has the final say
+            inserted = _insert(keep, report)
+            imported += inserted
+            skipped += len(batch) - inserted
+            done += len(batch)
+            _save_progress(progress_path, done)
+
+            elapsed = time.perf_counter() - started
+            click.echo(
+                f"{done} read, {imported} imported, {skipped} skipped "
+                f"({imported / elapsed:.0f} users/s)"
+            )
+
+    if report_path:
+        report_file.close()
+    if os.path.exists(progress_path):
+        os.remove(progress_path)
+    click.echo(f"Done: {imported} imported, {skipped} skipped in {time.perf_counter() - started:.1f}s")
+
+
+@users_cli.command("export")
+@click.argument("path", type=click.Path(dir_okay=False, allow_dash=True))
+@click.option("--format", "fmt", type=click.Choice(["csv", "jsonl"]), default=None, help="Defaults to the file extension.")
+@click.option("--batch-size", type=int, default=1000, show_default=True)
+@click.option("--include-hashes", is_flag=True, help="Add a password_hash column (re-importable with the hashes intact).")
+def export_users(path, fmt, batch_size, include_hashes):
+    """Export users to CSV or JSONL, streaming rows from the database."""
+    fmt = _format_for(path, fmt)
+    fields = EXPORT_FIELDS + (["password_hash"] if include_hashes else [])
+    columns = [User.id, User.username, User.fullname] + ([User.password] if include_hashes else [])
+
+    out = sys.stdout if path == "-" else open(path, "w", newline="")
+    started = time.perf_counter()
+    count = 0
+    try:
+        writer = csv.writer(out) if fmt == "csv" else None
+        if writer:
+            writer.writerow(fields)
+
+        result = db.session.execute(
+            select(*columns).order_by(User.id).execution_options(yield_per=batch_size)
+        )
+        for row in result:
+            if writer:
+                writer.writerow(row)
+            else:
+                out.write(json.dumps(dict(zip(fields, row))) + "\n")
+            count += 1
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    click.echo(f"Exported {count} users in {time.perf_counter() - started:.1f}s", err=True)
@@ -7,8 +7,96 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.getenv("DB_URI")
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # Password hashing; run `flask hash calibrate` to pick a method for this host
+    PASSWORD_HASH_METHOD = os.getenv("PASSWORD_HASH_METHOD", "scrypt:32768:8:1")
+    HASH_LATENCY_BUDGET_MS = float(os.getenv("HASH_LATENCY_BUDGET_MS", 50))
+
+    # Password hashing pool
+    HASH_POOL_SIZE = int(os.getenv("HASH_POOL_SIZE", os.cpu_count() or 1))
+    HASH_QUEUE_SIZE = int(os.getenv("HASH_QUEUE_SIZE", HASH_POOL_SIZE * 4))
+    HASH_TIMEOUT = float(os.getenv("HASH_TIMEOUT", 5.0))
+    HASH_RETRY_AFTER = int(os.getenv("HASH_RETRY_AFTER", 1))
+
+    # Cache of loaded users for current_user; invalidation is per process, so other
+    # workers can serve a changed or deleted user for up to IDENTITY_CACHE_TTL
+    IDENTITY_CACHE_SIZE = int(os.getenv("IDENTITY_CACHE_SIZE", 10000))
+    IDENTITY_CACHE_TTL = int(os.getenv("IDENTITY_CACHE_TTL", 60))
+    IDENTITY_CACHE_MAX_BYTES = int(os.getenv("IDENTITY_CACHE_MAX_BYTES", 4 * 1024 * 1024))
+
+    # Login/reset throttling ("memory" or "sqlite")
+    THROTTLE_ENABLED = os.getenv("THROTTLE_ENABLED", "1") != "0"
+    THROTTLE_BACKEND = os.getenv("THROTTLE_BACKEND", "memory")
+    THROTTLE_SQLITE_PATH = os.getenv("THROTTLE_SQLITE_PATH")
+    THROTTLE_WINDOW = int(os.getenv("THROTTLE_WINDOW", 60))
+    THROTTLE_IP_LIMIT = int(os.getenv("THROTTLE_IP_LIMIT", 30))
+    THROTTLE_USERNAME_LIMIT = int(os.getenv("THROTTLE_USERNAME_LIMIT", 10))
+    THROTTLE_MAX_KEYS = int(os.getenv("THROTTLE_MAX_KEYS", 100000))
+
+    # Signed API tokens for /api/auth/token (API_TOKEN_SECRET defaults to SECRET_KEY)
+    API_TOKEN_SECRET = os.getenv("API_TOKEN_SECRET")
+    API_ACCESS_TOKEN_TTL = int(os.getenv("API_ACCESS_TOKEN_TTL", 900))
+    API_REFRESH_TOKEN_TTL = int(os.getenv("API_REFRESH_TOKEN_TTL", 30 * 24 * 3600))
+
+    # Request instrumentation; /metrics is only served when METRICS_ENDPOINT is on
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") != "0"
+    METRICS_SERVER_TIMING = os.getenv("METRICS_SERVER_TIMING", "1") != "0"
+    METRICS_SLOW_REQUEST_MS = float(os.getenv("METRICS_SLOW_REQUEST_MS", 500))
+    METRICS_ENDPOINT = os.getenv("METRICS_ENDPOINT", "0") != "0"
+    METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+    # In-memory index of taken usernames for signup and the availability check
+    USERNAME_INDEX_PRELOAD = os.getenv("USERNAME_INDEX_PRELOAD", "1") != "0"
+    USERNAME_INDEX_REFRESH = int(os.getenv("USERNAME_INDEX_REFRESH", 300))
+    USERNAME_INDEX_CAPACITY = int(os.getenv("USERNAME_INDEX_CAPACITY", 100000))
+    USERNAME_INDEX_ERROR_RATE = float(os.getenv("USERNAME_INDEX_ERROR_RATE", 0.01))
+
+    # CSS bundles built by `flask assets build` (name -> sources under static/)
+    ASSET_BUNDLES = {
+        "app.css": ["instagram-style.css", "base.css"],
+    }
+    ASSETS_FINGERPRINT = os.getenv("ASSETS_FINGERPRINT", "1") != "0"
+
+    # Rendered-page cache for anonymous GETs; JINJA_BYTECODE_CACHE_DIR caches compiled templates on disk
+    PAGE_CACHE_ENABLED = os.getenv("PAGE_CACHE_ENABLED", "1") != "0"
+    PAGE_CACHE_SIZE = int(os.getenv("PAGE_CACHE_SIZE", 256))
+    PAGE_CACHE_MAX_BYTES = int(os.getenv("PAGE_CACHE_MAX_BYTES", 8 * 1024 * 1024))
+    JINJA_BYTECODE_CACHE_DIR = os.getenv("JINJA_BYTECODE_CACHE_DIR")
+
 class DevConf(Config):
     SECRET_KEY = "SECRET"
 
 class ProdConf(Config):
-    SECRET_KEY = os.getenv("SECRET_KEY")
\ No newline at end of file
+    SECRET_KEY = os.getenv("SECRET_KEY")
+
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", 10)),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", 20)),
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", 10)),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", 1800)),
+        "pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "1") != "0",
+    }
+
+    # Optional read replica; plain SELECTs go there until a request writes
+    SQLALCHEMY_BINDS = {
+        "replica": {"url": os.getenv("DB_REPLICA_URI"), **SQLALCHEMY_ENGINE_OPTIONS},
+    } if os.getenv("DB_REPLICA_URI") else {}
+
+    # Applied on every new SQLite connection; ignored for other databases
+    SQLITE_PRAGMAS = {
+        "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+        "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+        "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT", 5000)),
+        "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", 256 * 1024 * 1024)),
+        "cache_size": int(os.getenv("SQLITE_CACHE_SIZE", -64 * 1024)),
+    }
+
+    # Compiled templates survive restarts; relative paths are under the instance folder
+    JINJA_BYTECODE_CACHE_DIR = os.getenv("JINJA_BYTECODE_CACHE_DIR", "jinja_cache")
+
+class TestConf(Config):
+    TESTING = True
+    SECRET_KEY = "TEST"
+    SQLALCHEMY_DATABASE_URI = "sqlite://"
+    WTF_CSRF_ENABLED = False
+    THROTTLE_ENABLED = False
+    USERNAME_INDEX_PRELOAD = False
\ No newline at end of file
@@ -2,6 +2,24 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from flask_login import LoginManager
 
-db = SQLAlchemy()
+from app.services.assets import Assets
+from app.services.db_routing import RoutingSession
+from app.services.hashing import Hasher
+from app.services.identity_cache import IdentityCache
+from app.services.throttle import Throttle
+from app.services.tokens import ApiTokens
+from app.services.metrics import Metrics
+from app.services.page_cache import PageCache
+from app.services.usernames import UsernameIndex
+
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 migrate = Migrate()
-login_manager = LoginManager()
\ No newline at end of file
+login_manager = LoginManager()
+hasher = Hasher()
+identity_cache = IdentityCache()
+throttle = Throttle()
+metrics = Metrics()
+username_index = UsernameIndex()
+assets = Assets()
+page_cache = PageCache()
+api_tokens = ApiTokens()
\ No newline at end of file
@@ -1,10 +1,29 @@
 from flask_login import UserMixin
 
-from app.extensions import db, login_manager
+from app.extensions import db, login_manager, identity_cache, username_index, api_tokens
 
 @login_manager.user_loader
 def load_user(user_id: str):
-    return User.query.get(int(user_id))
+    user_id = int(user_id)
+    snapshot = identity_cache.get(user_id)
+    if snapshot is None:
+        user = db.session.get(User, user_id)
+        if user is None:
+            return None
+        snapshot = UserSnapshot.from_user(user)
+        identity_cache.set(user_id, snapshot)
+    return snapshot
+
+@login_manager.request_loader
+def load_user_from_request(request):
+    # API clients send "Authorization: Bearer <access token>"; no DB access here
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+    if scheme.lower() != "bearer":
+        return None
+    claims = api_tokens.load_access(token.strip())
+    if claims is None:
+        return None
+    return UserSnapshot(claims["uid"], claims["un"], claims["fn"])
 
 class User(db.Model, UserMixin):
     __tablename__ = "users"
@@ -12,6 +31,8 @@ class User(db.Model, UserMixin):
     username = db.Column(db.String(10), unique=True, nullable=False, index=True)
     fullname = db.Column(db.String(32), nullable=False)
     password = db.Column(db.String(256), nullable=False)
+    # bumped on password reset to revoke outstanding API tokens
+    token_version = db.Column(db.Integer, nullable=False, default=0, server_default="0")
 
     def __init__(self, username, fullname, password):
         self.username = username
@@ -19,4 +40,44 @@ class User(db.Model, UserMixin):
         self.password = password
 
     def get_id(self):
-        return str(self.id)
\ No newline at end of file
+        return str(self.id)
+
+class UserSnapshot(UserMixin):
+    # Detached, read-only view of a User for current_user; never holds the hash
+    __slots__ = ("id", "username", "fullname")
+
+    def __init__(self, id, username, fullname):
+        self.id = id
+        self.username = username
+        self.fullname = fullname
+
+    @classmethod
+    def from_user(cls, user):
+        return cls(user.id, user.username, user.fullname)
+
+    def get_id(self):
+        return str(self.id)
+
+@db.event.listens_for(User, "after_update")
+@db.event.listens_for(User, "after_delete")
+def invalidate_cached_user(mapper, connection, target):
+    # Held until commit: dropping the entry at flush lets a concurrent
+    # load_user cache the old committed row again
+    changed = db.inspect(target).session.info.setdefault("changed_users", {})
+    revoke = db.inspect(target).attrs.token_version.history.has_changes()
+    changed[target.id] = target.token_version if revoke else changed.get(target.id)
+
+@db.event.listens_for(db.session, "after_commit")
+def apply_user_changes(session):
+    for user_id, token_version in session.info.pop("changed_users", {}).items():
+        identity_cache.invalidate(user_id)
+        if token_version is not None:
+            api_tokens.revoke(user_id, token_version)
+
+@db.event.listens_for(db.session, "after_rollback")
+def drop_user_changes(session):
+    session.info.pop("changed_users", None)
+
+@db.event.listens_for(User, "after_insert")
+def index_username(mapper, connection, target):
+    username_index.add(target.username)
\ No newline at end of file
@@ -0,0 +1,65 @@
+from flask import Blueprint, request, jsonify
+from flask_login import login_required, current_user
+
+from app.models.users import User
+
+from app.extensions import db, hasher, throttle, api_tokens
+from app.services.hashing import HashingUnavailable
+from app.services.throttle import ThrottleExceeded
+
+api_bp = Blueprint("api", __name__, url_prefix="/api")
+
+def token_error(error, status):
+    return jsonify(error=error), status
+
+@api_bp.errorhandler(ThrottleExceeded)
+def throttled(error):
+    return jsonify(error="too_many_requests"), 429, {"Retry-After": str(error.retry_after)}
+
+@api_bp.errorhandler(HashingUnavailable)
+def hashing_unavailable(error):
+    return jsonify(error="temporarily_unavailable"), 503, {"Retry-After": str(error.retry_after)}
+
+@api_bp.errorhandler(401)
+def unauthorized(error):
+    return jsonify(error="unauthorized"), 401
+
+@api_bp.route("/auth/token", methods=["POST"])
+def token():
+    data = request.get_json(silent=True) or {}
+    grant_type = data.get("grant_type", "password")
+
+    if grant_type == "password":
+        username = data.get("username")
+        password = data.get("password")
+        if not isinstance(username, str) or not isinstance(password, str) or not username or not password:
+            return token_error("invalid_request", 400)
+
+        throttle.check("api.token", request.remote_addr, username)
+        user = User.query.filter_by(username = username).first()
+        if not (user and hasher.check(user.password, password)):
+            return token_error("invalid_grant", 401)
+
+        if hasher.needs_rehash(user.password):
+            try:
+                user.password = hasher.generate(password)
+                db.session.commit()
+            except HashingUnavailable:
+                pass
+
+    elif grant_type == "refresh_token":
+        # refresh is where revocation is enforced across processes
+        claims = api_tokens.load_refresh(data.get("refresh_token"))
+        user = db.session.get(User, claims["uid"]) if claims else None
+        if user is None or user.token_version != claims["tv"]:
+            return token_error("invalid_grant", 401)
+
+    else:
+        return token_error("unsupported_grant_type", 400)
+
+    return jsonify(api_tokens.issue(user))
+
+@api_bp.route("/me")
+@login_required
+def me():
+    return jsonify(id=current_user.id, username=current_user.username, fullname=current_user.fullname)
\ No newline at end of file
@@ -1,15 +1,21 @@
 from flask import Blueprint, render_template, redirect, url_for, request, flash
 from flask_login import login_user, logout_user, login_required
-from werkzeug.security import check_password_hash, generate_password_hash
 
 from app.forms.loginForm import LoginForm
 from app.forms.resetUserForm import ResetUserForm
 from app.models.users import User
 
-from app.extensions import db
+from app.extensions import db, hasher, throttle, page_cache
+from app.services.hashing import HashingUnavailable
 
 auth_bp = Blueprint("auth", __name__, url_prefix="/auth")
 
+@auth_bp.before_request
+def throttle_attempts():
+    # Runs before the view so rejected attempts never reach the DB or the hasher
+    if request.method == "POST" and request.endpoint in ("auth.login", "auth.reset"):
+        throttle.check(request.endpoint, request.remote_addr, request.form.get("username"))
+
 @auth_bp.route("/logout")
 @login_required
 def logout():
@@ -17,6 +23,7 @@ def logout():
     return redirect(url_for("auth.login"))
 
 @auth_bp.route("/reset", methods=["GET", "POST"])
+@page_cache.cached
 def reset():
     form = ResetUserForm()
     msg = ""
@@ -24,7 +31,8 @@ def reset():
     if form.validate_on_submit():
         user = User.query.filter_by(username = form.username.data).first()
         if user:
-            user.password = generate_password_hash(form.new_password.data)
+            user.password = hasher.generate(form.new_password.data)
+            user.token_version += 1
             db.session.commit()
             flash("Password reset successful. Please login with your new password.", "success")
             return redirect(url_for("auth.login"))
@@ -34,13 +42,22 @@ def reset():
     return render_template("auth/reset.html", form=form)
 
 @auth_bp.route("/login", methods=["GET", "POST"])
+@page_cache.cached
 def login():
     form = LoginForm()
     errors = []
 
     if form.validate_on_submit():
         user = User.query.filter_by(username = form.username.data).first()
-        if (user and check_password_hash(user.password, form.password.data)):
+        if (user and hasher.check(user.password, form.password.data)):
+            if hasher.needs_rehash(user.password):
+                # Upgrade the stored hash while we still have the plaintext;
+                # skipping it under load is fine, the next login retries
+                try:
+                    user.password = hasher.generate(form.password.data)
+                    db.session.commit()
+                except HashingUnavailable:
+                    pass
             login_user(user)
 
             next = request.args.get("next")
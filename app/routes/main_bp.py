@@ -1,38 +1,52 @@
-from flask import Blueprint, render_template
+from flask import Blueprint, render_template, request, jsonify
 from flask_login import login_required, current_user
-from werkzeug.security import generate_password_hash,\
-                            check_password_hash
+from sqlalchemy.exc import IntegrityError
 
-from app.extensions import db
+from app.extensions import db, hasher, username_index, page_cache
 from app.forms.signUpForm import SignupForm
 from app.models.users import User
 
 main_bp = Blueprint("main", __name__)
 
 @main_bp.route("/")
+@page_cache.cached
 def index():
     return render_template("index.html")
 
 @main_bp.route("/signup", methods=["GET", "POST"])
+@page_cache.cached
 def signup():
     form = SignupForm()
     msg = ""
     if form.validate_on_submit():
-        user = User.query.filter_by(username=form.username.data).first()
-
-        if user:
+        # The filter only saves the hash for names we already know are taken;
+        # the unique index is what actually decides
+        if username_index.is_taken(form.username.data):
             msg = "User already exists"
         else:
             user = User( username=form.username.data,
                         fullname=form.fullname.data,
-                        password=generate_password_hash(form.password.data)
+                        password=hasher.generate(form.password.data)
                     )
             db.session.add(user)
-            db.session.commit()
-            msg = "User created."
+            try:
+                db.session.commit()
+                msg = "User created."
+            except IntegrityError:
+                db.session.rollback()
+                msg = "User already exists"
 
     return render_template("signup.html", form=form, msg=msg)
 
+@main_bp.route("/signup/available")
+def username_available():
+    username = request.args.get("username", "").strip()
+    if not 5 <= len(username) <= 10:
+        return jsonify(username=username, available=False, reason="Username must be 5 to 10 characters.")
+    # a name taken by another worker since the last rebuild can still show as
+    # available; signup itself is decided by the unique index
+    return jsonify(username=username, available=not username_index.is_taken(username), advisory=True)
+
 @main_bp.route("/profile")
 @login_required
 def profile():
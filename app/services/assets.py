@@ -0,0 +1,146 @@
+import gzip
+import hashlib
+import json
+import os
+import re
+
+from flask import make_response, request, send_from_directory
+
+DIST_DIR = "dist"
+MANIFEST = "manifest.json"
+ONE_YEAR = 365 * 24 * 3600
+
+
+def minify_css(css):
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.S)
+    css = re.sub(r"\s+", " ", css)
+    # no space is significant before ':' (".a :hover"), so only strip after it
+    css = re.sub(r"\s*([{};,>])\s*", r"\1", css)
+    css = re.sub(r":\s+", ":", css)
+    css = css.replace(";}", "}")
+    return css.strip()
+
+
+def build(static_folder, bundles):
+    """Write minified, content-hashed bundles plus ``.gz`` siblings and a manifest.
+
+    ``bundles`` maps the logical name templates ask for (``app.css``) to
+    the source files under ``static_folder`` it is made of.
+    """
+    out_dir = os.path.join(static_folder, DIST_DIR)
+    os.makedirs(out_dir, exist_ok=True)
+    previous = _read_manifest(os.path.join(out_dir, MANIFEST))
+    manifest = {}
+
+    for name, sources in bundles.items():
+        data = "\n".join(minify_css(css) for css in _read_sources(static_folder, sources)).encode()
+
+        digest = hashlib.sha256(data).hexdigest()
+        stem, ext = os.path.splitext(name)
+        filename = f"{stem}.{digest[:12]}{ext}"
+        with open(os.path.join(out_dir, filename), "wb") as f:
+            f.write(data)
+        with open(os.path.join(out_dir, filename + ".gz"), "wb") as f:
+            # mtime=0 keeps the .gz byte-identical across builds
+            f.write(gzip.compress(data, compresslevel=9, mtime=0))
+
+        manifest[name] = {
+            "file": f"{DIST_DIR}/{filename}",
+            "etag": digest[:32],
+            "size": len(data),
+            "gzip_size": os.path.getsize(os.path.join(out_dir, filename + ".gz")),
+            "sources": list(sources),
+        }
+
+    # drop outputs of older builds, but keep the previous one: workers that
+    # still run with its manifest keep linking to those files during a deploy
+    keep = {os.path.basename(e["file"]) for e in (*manifest.values(), *previous.values())}
+    keep |= {f + ".gz" for f in keep} | {MANIFEST}
+    for leftover in os.listdir(out_dir):
+        if leftover not in keep:
+            os.remove(os.path.join(out_dir, leftover))
+
+    with open(os.path.join(out_dir, MANIFEST), "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+def _read_manifest(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def _read_sources(static_folder, sources):
+    for source in sources:
+        with open(os.path.join(static_folder, source), encoding="utf-8") as f:
+            yield f.read()
+
+
+class Assets:
+    """Points ``url_for('static', ...)`` at fingerprinted builds and serves them.
+
+    Without a manifest (no ``flask assets build`` yet) bundles are served
+    unminified, straight from their sources.
+    """
+
+    def __init__(self, app=None):
+        self.manifest = {}
+        self.bundles = {}
+        self._files = {}
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.bundles = app.config.get("ASSET_BUNDLES", {})
+        self.load(app.static_folder)
+        app.extensions["assets"] = self
+
+        self._plain_static = app.view_functions["static"]
+        app.view_functions["static"] = self._static
+        if app.config.get("ASSETS_FINGERPRINT", True):
+            app.url_defaults(self._url_defaults)
+
+    def load(self, static_folder):
+        self.static_folder = static_folder
+        self.manifest = _read_manifest(os.path.join(static_folder, DIST_DIR, MANIFEST))
+        self._files = {entry["file"]: entry for entry in self.manifest.values()}
+
+    def _url_defaults(self, endpoint, values):
+        if endpoint == "static":
+            entry = self.manifest.get(values.get("filename"))
+            if entry is not None:
+                values["filename"] = entry["file"]
+
+    def _static(self, filename):
+        entry = self._files.get(filename)
+        if entry is None:
+            if filename in self.bundles:
+                return self._unbuilt(filename)
+            return self._plain_static(filename=filename)
+
+        use_gzip = request.accept_encodings["gzip"] > 0
+        path = filename + ".gz" if use_gzip else filename
+        response = send_from_directory(
+            self.static_folder,
+            path,
+            mimetype="text/css",
+            etag=entry["etag"] + ("-gz" if use_gzip else ""),
+            max_age=ONE_YEAR,
+        )
+        if use_gzip:
+            response.headers["Content-Encoding"] = "gzip"
+        response.vary.add("Accept-Encoding")
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        return response
+
+    def _unbuilt(self, name):
+        css = "\n".join(_read_sources(self.static_folder, self.bundles[name]))
+        response = make_response(css)
+        response.mimetype = "text/css"
+        response.cache_control.no_cache = True
+        return response
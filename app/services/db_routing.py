@@ -0,0 +1,55 @@
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, inspect
+from sqlalchemy.sql import Select
+
+REPLICA_BIND = "replica"
+
+
+class RoutingSession(Session):
+    """Sends plain SELECTs on the default bind to the ``replica`` bind, if configured.
+
+    Once the session has flushed anything it sticks to the primary, so a
+    request always reads its own writes.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (
+            bind is None
+            and isinstance(clause, Select)
+            and not self.info.get("use_primary")
+            and REPLICA_BIND in self._db.engines
+            and self._on_default_bind(mapper, clause)
+        ):
+            return self._db.engines[REPLICA_BIND]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    @staticmethod
+    def _on_default_bind(mapper, clause):
+        tables = [inspect(mapper).local_table] if mapper is not None else []
+        tables += [t for t in clause.get_final_froms() if hasattr(t, "metadata")]
+        return all(t.metadata.info.get("bind_key") is None for t in tables)
+
+
+@event.listens_for(RoutingSession, "before_flush")
+def _stick_to_primary(session, flush_context, instances):
+    session.info["use_primary"] = True
+
+
+def apply_sqlite_pragmas(engine, pragmas):
+    """Run ``PRAGMA key=value`` on every new DBAPI connection of a SQLite engine."""
+    if not pragmas or engine.dialect.name != "sqlite":
+        return
+
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for key, value in pragmas.items():
+            cursor.execute(f"PRAGMA {key}={value}")
+        cursor.close()
+
+
+def init_engine_tuning(app, db):
+    pragmas = app.config.get("SQLITE_PRAGMAS")
+    with app.app_context():
+        for engine in db.engines.values():
+            apply_sqlite_pragmas(engine, pragmas)
@@ -0,0 +1,195 @@
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+
+from blinker import Namespace
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+
+_signals = Namespace()
+
+# sent after every hash call with ``elapsed`` in seconds, queue wait included
+hash_completed = _signals.signal("hash-completed")
+
+
+def _method_id(method):
+    """Spell out werkzeug's defaults, e.g. "scrypt" -> "scrypt:32768:8:1"."""
+    name, *args = method.split(":")
+    if name == "scrypt" and not args:
+        return f"scrypt:{2 ** 15}:8:1"
+    if name == "pbkdf2":
+        hash_name = args[0] if args else "sha256"
+        iterations = args[1] if len(args) > 1 else DEFAULT_PBKDF2_ITERATIONS
+        return f"pbkdf2:{hash_name}:{iterations}"
+    return method
+
+
+class HashingUnavailable(Exception):
+    """Raised when the hashing pool is full or a hash call timed out."""
+
+    def __init__(self, reason, retry_after):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class Hasher:
+    """Runs password hashing on a fixed-size process pool.
+
+    At most ``HASH_QUEUE_SIZE`` calls may be pending at once; anything past
+    that is rejected straight away so the route can answer 503 instead of
+    piling up behind the KDF.
+    """
+
+    def __init__(self, app=None):
+        self.pool_size = 0
+        self.queue_size = 0
+        self.timeout = None
+        self.retry_after = 1
+        self.method = "scrypt"
+        self._method_id = None
+        self._pool = None
+        self._pool_pid = None
+        self._slots = None
+        self._lock = threading.Lock()
+        self._stats = self._empty_stats()
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.pool_size = app.config.get("HASH_POOL_SIZE", os.cpu_count() or 1)
+        self.queue_size = app.config.get("HASH_QUEUE_SIZE", self.pool_size * 4)
+        self.timeout = app.config.get("HASH_TIMEOUT", 5.0)
+        self.retry_after = app.config.get("HASH_RETRY_AFTER", 1)
+        self.method = app.config.get("PASSWORD_HASH_METHOD", "scrypt")
+        self._method_id = None
+        self._slots = threading.BoundedSemaphore(max(self.queue_size, 1))
+
+        app.extensions["hasher"] = self
+        app.register_error_handler(HashingUnavailable, self._unavailable)
+
+    def generate(self, password):
+        return self._run(generate_password_hash, password, self.method)
+
+    def check(self, pwhash, password):
+        return self._run(check_password_hash, pwhash, password)
+
+    def needs_rehash(self, pwhash):
+        # werkzeug hashes look like "<method>$<salt>$<hash>", with the
+        # method's cost parameters spelled out, e.g. "scrypt:32768:8:1"
+        if self._method_id is None:
+            self._method_id = _method_id(self.method)
+        return pwhash.split("$", 1)[0] != self._method_id
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats["pool_size"] = self.pool_size
+        stats["queue_size"] = self.queue_size
+        stats["avg_latency_ms"] = (
+            stats["total_latency_ms"] / stats["completed"] if stats["completed"] else 0.0
+        )
+        return stats
+
+    def reset_stats(self):
+        with self._lock:
+            self._stats = self._empty_stats()
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+            self._pool_pid = None
+
+    def _run(self, fn, *args, **kwargs):
+        # pool size 0 keeps hashing on the request thread (tests, tiny deployments)
+        if self.pool_size <= 0:
+            return self._timed(fn, *args, **kwargs)
+
+        slots = self._slots
+        if not slots.acquire(blocking=False):
+            self._count("rejected")
+            raise HashingUnavailable("hashing queue full", self.retry_after)
+
+        started = time.perf_counter()
+        self._enter()
+        try:
+            future = self._get_pool().submit(fn, *args, **kwargs)
+        except BaseException:
+            self._leave(slots)
+            raise
+        # a job that timed out keeps running in the pool, so its slot is only
+        # freed once it is really done
+        future.add_done_callback(lambda _: self._leave(slots))
+        try:
+            result = future.result(timeout=self.timeout)
+        except FutureTimeout:
+            future.cancel()
+            self._count("timeouts")
+            raise HashingUnavailable("hashing timed out", self.retry_after)
+
+        self._record(time.perf_counter() - started)
+        return result
+
+    def _timed(self, fn, *args, **kwargs):
+        started = time.perf_counter()
+        result = fn(*args, **kwargs)
+        self._record(time.perf_counter() - started)
+        return result
+
+    def _get_pool(self):
+        # a forked worker must not reuse the parent's pool
+        pid = os.getpid()
+        if self._pool is None or self._pool_pid != pid:
+            with self._lock:
+                if self._pool is None or self._pool_pid != pid:
+                    self._pool = ProcessPoolExecutor(max_workers=self.pool_size)
+                    self._pool_pid = pid
+        return self._pool
+
+    def _enter(self):
+        with self._lock:
+            self._stats["submitted"] += 1
+            self._stats["queue_depth"] += 1
+            self._stats["max_queue_depth"] = max(
+                self._stats["max_queue_depth"], self._stats["queue_depth"]
+            )
+
+    def _leave(self, slots):
+        with self._lock:
+            self._stats["queue_depth"] -= 1
+        slots.release()
+
+    def _record(self, elapsed):
+        elapsed_ms = elapsed * 1000
+        with self._lock:
+            self._stats["completed"] += 1
+            self._stats["total_latency_ms"] += elapsed_ms
+            self._stats["max_latency_ms"] = max(self._stats["max_latency_ms"], elapsed_ms)
+        hash_completed.send(self, elapsed=elapsed)
+
+    def _count(self, key):
+        with self._lock:
+            self._stats[key] += 1
+
+    @staticmethod
+    def _empty_stats():
+        return {
+            "submitted": 0,
+            "completed": 0,
+            "rejected": 0,
+            "timeouts": 0,
+            "queue_depth": 0,
+            "max_queue_depth": 0,
+            "total_latency_ms": 0.0,
+            "max_latency_ms": 0.0,
+        }
+
+    @staticmethod
+    def _unavailable(error):
+        return (
+            "Service is busy, please try again shortly.",
+            503,
+            {"Retry-After": str(error.retry_after)},
+        )
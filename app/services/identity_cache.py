@@ -0,0 +1,122 @@
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+
+class IdentityCache:
+    """In-process LRU+TTL cache of user snapshots keyed by user id.
+
+    Entries are evicted when they expire, when the cache holds more than
+    ``IDENTITY_CACHE_SIZE`` entries, or when the estimated size of all
+    snapshots goes past ``IDENTITY_CACHE_MAX_BYTES``. ``invalidate`` only
+    reaches this process; other workers notice changes when entries expire.
+    """
+
+    def __init__(self, app=None):
+        self.max_entries = 0
+        self.ttl = 0
+        self.max_bytes = 0
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = self._empty_stats()
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.max_entries = app.config.get("IDENTITY_CACHE_SIZE", 10000)
+        self.ttl = app.config.get("IDENTITY_CACHE_TTL", 60)
+        self.max_bytes = app.config.get("IDENTITY_CACHE_MAX_BYTES", 4 * 1024 * 1024)
+        self.clear()
+
+        app.extensions["identity_cache"] = self
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0 and self.ttl > 0
+
+    def get(self, user_id):
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+
+            snapshot, size, expires_at = entry
+            if expires_at <= time.monotonic():
+                self._drop(user_id)
+                self._stats["expirations"] += 1
+                self._stats["misses"] += 1
+                return None
+
+            self._entries.move_to_end(user_id)
+            self._stats["hits"] += 1
+            return snapshot
+
+    def set(self, user_id, snapshot):
+        if not self.enabled:
+            return
+
+        size = self._sizeof(snapshot)
+        with self._lock:
+            if user_id in self._entries:
+                self._drop(user_id)
+            self._entries[user_id] = (snapshot, size, time.monotonic() + self.ttl)
+            self._bytes += size
+
+            while self._entries and (
+                len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+            ):
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self._stats["evictions"] += 1
+
+    def invalidate(self, user_id):
+        with self._lock:
+            if user_id in self._entries:
+                self._drop(user_id)
+                self._stats["invalidations"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+            stats["bytes"] = self._bytes
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+    def reset_stats(self):
+        with self._lock:
+            self._stats = self._empty_stats()
+
+    def _drop(self, user_id):
+        _, size, _ = self._entries.pop(user_id)
+        self._bytes -= size
+
+    @staticmethod
+    def _sizeof(snapshot):
+        size = sys.getsizeof(snapshot)
+        for name in getattr(snapshot, "__slots__", ()):
+            size += sys.getsizeof(getattr(snapshot, name, None))
+        return size
+
+    @staticmethod
+    def _empty_stats():
+        return {
+            "hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "invalidations": 0,
+        }
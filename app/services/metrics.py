@@ -0,0 +1,263 @@
+import logging
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+
+from flask import Response, abort, before_render_template, current_app, g, has_request_context, request, request_finished, request_started, template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.services.hashing import hash_completed
+
+logger = logging.getLogger(__name__)
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def render(self, name, labels=""):
+        lines, cumulative = [], 0
+        sep = "," if labels else ""
+        for bound, n in zip(self.buckets + (float("inf"),), self.counts):
+            cumulative += n
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            lines.append(f'{name}_bucket{{{labels}{sep}le="{le}"}} {cumulative}')
+        suffix = f"{{{labels}}}" if labels else ""
+        lines.append(f"{name}_sum{suffix} {self.sum}")
+        lines.append(f"{name}_count{suffix} {self.count}")
+        return lines
+
+
+class _Timings:
+    __slots__ = ("started", "db", "queries", "hash", "hashes", "template", "session")
+
+    def __init__(self, started=None):
+        self.started = time.perf_counter() if started is None else started
+        self.db = self.hash = self.template = self.session = 0.0
+        self.queries = self.hashes = 0
+
+
+def _timings():
+    if has_request_context():
+        return g.get("_timings")
+    return None
+
+
+def _start_timings(started=None):
+    # the session is opened before request_started fires, so whichever
+    # of the two comes first starts the clock
+    timings = g.get("_timings")
+    if timings is None:
+        timings = g._timings = _Timings(started)
+    return timings
+
+
+class _TimedSessionInterface:
+    """Wraps the app's session interface to time cookie (de)serialisation."""
+
+    def __init__(self, inner):
+        self.inner = inner
+
+    def __getattr__(self, name):
+        return getattr(self.inner, name)
+
+    def open_session(self, app, request):
+        started = time.perf_counter()
+        session = self.inner.open_session(app, request)
+        _start_timings(started).session += time.perf_counter() - started
+        return session
+
+    def save_session(self, app, session, response):
+        started = time.perf_counter()
+        self.inner.save_session(app, session, response)
+        timings = _timings()
+        if timings is not None:
+            timings.session += time.perf_counter() - started
+
+
+class Metrics:
+    """Per-request phase timing, Server-Timing headers and a Prometheus endpoint."""
+
+    def __init__(self, app=None):
+        self.enabled = True
+        self.server_timing = True
+        self.slow_request_ms = 500
+        self._lock = threading.Lock()
+        self._reset()
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.get("METRICS_ENABLED", True)
+        self.server_timing = app.config.get("METRICS_SERVER_TIMING", True)
+        self.slow_request_ms = app.config.get("METRICS_SLOW_REQUEST_MS", 500)
+        app.extensions["metrics"] = self
+        if not self.enabled:
+            return
+
+        if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+            event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+            event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        hash_completed.connect(_on_hash, weak=False)
+        before_render_template.connect(_before_render, app, weak=False)
+        template_rendered.connect(_on_rendered, app, weak=False)
+
+        # request_finished also fires when a null session skips save_session
+        request_started.connect(self._start, app, weak=False)
+        request_finished.connect(self._finished, app, weak=False)
+        app.session_interface = _TimedSessionInterface(app.session_interface)
+
+        if app.config.get("METRICS_ENDPOINT", False):
+            app.add_url_rule("/metrics", "metrics", self._view)
+
+    def _start(self, sender, **extra):
+        _start_timings()
+
+    def _finished(self, sender, response, **extra):
+        timings = _timings()
+        if timings is not None:
+            self._finish(timings, response)
+
+    def _finish(self, timings, response):
+        total = time.perf_counter() - timings.started
+        endpoint = request.endpoint or "unmatched"
+
+        if self.server_timing:
+            response.headers["Server-Timing"] = ", ".join([
+                f'db;dur={timings.db * 1000:.2f};desc="{timings.queries} queries"',
+                f"hash;dur={timings.hash * 1000:.2f}",
+                f"tpl;dur={timings.template * 1000:.2f}",
+                f"session;dur={timings.session * 1000:.2f}",
+                f"total;dur={total * 1000:.2f}",
+            ])
+
+        slow = total * 1000 >= self.slow_request_ms
+        with self._lock:
+            self._requests[endpoint].observe(total)
+            self._statuses[(endpoint, response.status_code)] += 1
+            self._queries[endpoint] += timings.queries
+            self._db_seconds[endpoint] += timings.db
+            self._template_seconds[endpoint] += timings.template
+            if timings.hashes:
+                self._hash.observe(timings.hash)
+            if slow:
+                self._slow[endpoint] += 1
+
+        if slow:
+            logger.warning(
+                "slow request %s %s %d: total=%.1fms db=%.1fms (%d queries) hash=%.1fms tpl=%.1fms session=%.1fms",
+                request.method, request.path, response.status_code, total * 1000,
+                timings.db * 1000, timings.queries, timings.hash * 1000,
+                timings.template * 1000, timings.session * 1000,
+            )
+
+    def render(self):
+        lines = []
+        with self._lock:
+            lines += [
+                "# HELP app_request_duration_seconds Request latency by endpoint.",
+                "# TYPE app_request_duration_seconds histogram",
+            ]
+            for endpoint, hist in sorted(self._requests.items()):
+                lines += hist.render("app_request_duration_seconds", f'endpoint="{endpoint}"')
+
+            lines += ["# HELP app_requests_total Responses by endpoint and status.", "# TYPE app_requests_total counter"]
+            for (endpoint, status), n in sorted(self._statuses.items()):
+                lines.append(f'app_requests_total{{endpoint="{endpoint}",status="{status}"}} {n}')
+
+            for name, kind, help_, values in (
+                ("app_db_queries_total", "counter", "SQL statements executed.", self._queries),
+                ("app_db_duration_seconds_total", "counter", "Time spent in SQL statements.", self._db_seconds),
+                ("app_template_duration_seconds_total", "counter", "Time spent rendering templates.", self._template_seconds),
+                ("app_slow_requests_total", "counter", "Requests over METRICS_SLOW_REQUEST_MS.", self._slow),
+            ):
+                lines += [f"# HELP {name} {help_}", f"# TYPE {name} {kind}"]
+                for endpoint, value in sorted(values.items()):
+                    lines.append(f'{name}{{endpoint="{endpoint}"}} {value}')
+
+            lines += [
+                "# HELP app_password_hash_seconds Hashing time per request, queue wait included.",
+                "# TYPE app_password_hash_seconds histogram",
+            ]
+            lines += self._hash.render("app_password_hash_seconds")
+
+        for ext, prefix in (
+            ("hasher", "app_hash_pool"),
+            ("identity_cache", "app_identity_cache"),
+            ("username_index", "app_username_index"),
+            ("page_cache", "app_page_cache"),
+        ):
+            service = current_app.extensions.get(ext)
+            if service is None:
+                continue
+            for key, value in sorted(service.stats().items()):
+                lines.append(f"{prefix}_{key} {value}")
+
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._reset()
+
+    def _reset(self):
+        self._requests = defaultdict(Histogram)
+        self._statuses = defaultdict(int)
+        self._queries = defaultdict(int)
+        self._db_seconds = defaultdict(float)
+        self._template_seconds = defaultdict(float)
+        self._slow = defaultdict(int)
+        self._hash = Histogram()
+
+    def _view(self):
+        token = current_app.config.get("METRICS_TOKEN")
+        if token and request.headers.get("Authorization") != f"Bearer {token}":
+            abort(401)
+        return Response(self.render(), mimetype="text/plain; version=0.0.4")
+
+
+# The start time lives on the execution context, which is dropped with the
+# statement, so a query that raises leaves nothing behind.
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._metrics_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_metrics_started", None)
+    timings = _timings()
+    if started is not None and timings is not None:
+        timings.db += time.perf_counter() - started
+        timings.queries += 1
+
+
+def _on_hash(sender, elapsed):
+    timings = _timings()
+    if timings is not None:
+        timings.hash += elapsed
+        timings.hashes += 1
+
+
+def _before_render(sender, template, context):
+    timings = _timings()
+    if timings is not None:
+        g._template_started = time.perf_counter()
+
+
+def _on_rendered(sender, template, context):
+    timings = _timings()
+    started = g.pop("_template_started", None) if timings is not None else None
+    if started is not None:
+        timings.template += time.perf_counter() - started
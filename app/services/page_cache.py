@@ -0,0 +1,150 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import current_app, make_response, request, session
+from flask_wtf.csrf import generate_csrf
+from jinja2 import FileSystemBytecodeCache
+
+CSRF_PLACEHOLDER = "\x00csrf-token\x00"
+
+
+class PageCache:
+    """Caches rendered GET pages for anonymous visitors.
+
+    A page is rendered once; its CSRF token is swapped for a placeholder
+    before it is stored and a fresh token is spliced back in on every hit.
+    Visitors with pending flashed messages or a logged-in session always
+    get a live render.
+    """
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self.max_entries = 0
+        self.max_bytes = 0
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = self._empty_stats()
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.get("PAGE_CACHE_ENABLED", True) and not app.debug
+        self.max_entries = app.config.get("PAGE_CACHE_SIZE", 256)
+        self.max_bytes = app.config.get("PAGE_CACHE_MAX_BYTES", 8 * 1024 * 1024)
+        self.clear()
+
+        bytecode_dir = app.config.get("JINJA_BYTECODE_CACHE_DIR")
+        if bytecode_dir:
+            bytecode_dir = os.path.join(app.instance_path, bytecode_dir)
+            os.makedirs(bytecode_dir, exist_ok=True)
+            app.jinja_env.bytecode_cache = FileSystemBytecodeCache(bytecode_dir)
+
+        app.extensions["page_cache"] = self
+
+    def cached(self, view):
+        """Decorator for views whose GET output only varies by CSRF token and flashes."""
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not self._cacheable():
+                return view(*args, **kwargs)
+            hit = self._serve()
+            if hit is not None:
+                return hit
+            return self._store(view(*args, **kwargs))
+        return wrapper
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+            stats["bytes"] = self._bytes
+        return stats
+
+    def _cacheable(self):
+        if not self.enabled or request.method != "GET":
+            return False
+        if "_user_id" in session or session.get("_flashes"):
+            self._count("bypass")
+            return False
+        return True
+
+    def _serve(self):
+        # cached views ignore the query string, so it must not split entries
+        key = request.path
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+
+        body, mimetype, version = entry
+        token = self._csrf_token()
+        if token is not None:
+            body = body.replace(CSRF_PLACEHOLDER, token)
+        return self._finish(make_response(body), version, mimetype)
+
+    def _store(self, rv):
+        response = make_response(rv)
+        if response.status_code != 200 or response.mimetype != "text/html" or response.is_streamed:
+            return response
+
+        body = response.get_data(as_text=True)
+        token = self._csrf_token()
+        template = body.replace(token, CSRF_PLACEHOLDER) if token else body
+        version = hashlib.sha1(template.encode()).hexdigest()[:16]
+        size = len(template)
+
+        with self._lock:
+            old = self._entries.pop(request.path, None)
+            if old is not None:
+                self._bytes -= len(old[0])
+            self._entries[request.path] = (template, response.mimetype, version)
+            self._bytes += size
+            while self._entries and (
+                len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+            ):
+                _, (evicted, _, _) = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+                self._stats["evictions"] += 1
+
+        return self._finish(response, version, response.mimetype)
+
+    def _finish(self, response, version, mimetype):
+        response.mimetype = mimetype
+        # The signed token changes every request, so the ETag follows the
+        # session's raw token and is rotated halfway through its lifetime
+        raw = session.get(current_app.config.get("WTF_CSRF_FIELD_NAME", "csrf_token"), "")
+        window = current_app.config.get("WTF_CSRF_TIME_LIMIT") or 3600
+        epoch = int(time.time() // max(window // 2, 1))
+        response.set_etag(hashlib.sha1(f"{version}:{raw}:{epoch}".encode()).hexdigest())
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+        response.vary.add("Cookie")
+        return response.make_conditional(request)
+
+    @staticmethod
+    def _csrf_token():
+        if not current_app.config.get("WTF_CSRF_ENABLED", True):
+            return None
+        return generate_csrf()
+
+    def _count(self, key):
+        with self._lock:
+            self._stats[key] += 1
+
+    @staticmethod
+    def _empty_stats():
+        return {"hits": 0, "misses": 0, "bypass": 0, "evictions": 0}
@@ -0,0 +1,210 @@
+import math
+from abc import ABC, abstractmethod
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class ThrottleExceeded(Exception):
+    def __init__(self, key, retry_after):
+        super().__init__(key)
+        self.key = key
+        self.retry_after = retry_after
+
+
+def _slide(state, limit, window, now):
+    """Sliding-window counter over two fixed windows.
+
+    ``state`` is ``[window_index, previous_count, current_count]`` and is
+    updated in place. Returns ``(allowed, retry_after)``.
+    """
+    index = int(now // window)
+    if state[0] != index:
+        state[1] = state[2] if state[0] == index - 1 else 0
+        state[2] = 0
+        state[0] = index
+
+    elapsed = now - index * window
+    estimated = state[1] * (window - elapsed) / window + state[2]
+    if estimated + 1 > limit:
+        return False, max(1, math.ceil(window - elapsed))
+
+    state[2] += 1
+    return True, 0
+
+
+class ThrottleBackend(ABC):
+    """Counter storage for ``Throttle``; ``THROTTLE_BACKEND`` may be an instance."""
+
+    @abstractmethod
+    def hit(self, key, limit, window):
+        """Count one attempt against ``key``; return ``(allowed, retry_after)``."""
+
+    @abstractmethod
+    def reset(self):
+        """Forget all counters."""
+
+
+class MemoryBackend(ThrottleBackend):
+    """Per-process counters, capped at ``max_keys`` (least recently hit go first)."""
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._counters = OrderedDict()
+        self._lock = threading.Lock()
+
+    def hit(self, key, limit, window):
+        now = time.time()
+        with self._lock:
+            state = self._counters.get(key)
+            if state is None:
+                state = self._counters[key] = [0, 0, 0]
+            else:
+                self._counters.move_to_end(key)
+            allowed = _slide(state, limit, window, now)
+
+            while len(self._counters) > self.max_keys:
+                self._counters.popitem(last=False)
+        return allowed
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+
+
+class SQLiteBackend(ThrottleBackend):
+    """Counters in a SQLite file so every worker process on a host shares them."""
+
+    PRUNE_EVERY = 1000
+
+    def __init__(self, path, max_keys=100000):
+        self.path = path
+        self.max_keys = max_keys
+        self._local = threading.local()
+        self._hits = 0
+
+        # ``with conn`` only scopes a transaction, it doesn't close anything
+        conn = self._connect()
+        try:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS throttle ("
+                " key TEXT PRIMARY KEY,"
+                " window INTEGER NOT NULL,"
+                " prev INTEGER NOT NULL,"
+                " curr INTEGER NOT NULL,"
+                " touched REAL NOT NULL)"
+            )
+        finally:
+            conn.close()
+
+    def hit(self, key, limit, window):
+        now = time.time()
+        conn = self._connection()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT window, prev, curr FROM throttle WHERE key = ?", (key,)
+            ).fetchone()
+            state = list(row) if row else [0, 0, 0]
+            allowed = _slide(state, limit, window, now)
+            conn.execute(
+                "INSERT OR REPLACE INTO throttle (key, window, prev, curr, touched)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (key, state[0], state[1], state[2], now),
+            )
+
+            self._hits += 1
+            if self._hits % self.PRUNE_EVERY == 0:
+                self._prune(conn, now - 2 * window)
+        return allowed
+
+    def reset(self):
+        conn = self._connection()
+        with conn:
+            conn.execute("DELETE FROM throttle")
+
+    def _prune(self, conn, stale_before):
+        conn.execute("DELETE FROM throttle WHERE touched < ?", (stale_before,))
+        conn.execute(
+            "DELETE FROM throttle WHERE key IN ("
+            " SELECT key FROM throttle ORDER BY touched DESC LIMIT -1 OFFSET ?)",
+            (self.max_keys,),
+        )
+
+    def _connection(self):
+        # one connection per thread, and never one inherited across fork
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = self._local.conn = self._connect()
+            self._local.pid = os.getpid()
+        return conn
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+
+class Throttle:
+    """Rate limits login/reset attempts per client IP and per username."""
+
+    def __init__(self, app=None):
+        self.enabled = True
+        self.backend = None
+        self.window = 60
+        self.ip_limit = 30
+        self.username_limit = 10
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.get("THROTTLE_ENABLED", True)
+        self.window = app.config.get("THROTTLE_WINDOW", 60)
+        self.ip_limit = app.config.get("THROTTLE_IP_LIMIT", 30)
+        self.username_limit = app.config.get("THROTTLE_USERNAME_LIMIT", 10)
+        self.backend = self._make_backend(app)
+
+        app.extensions["throttle"] = self
+        app.register_error_handler(ThrottleExceeded, self._exceeded)
+
+    def check(self, scope, ip, username=None):
+        if not self.enabled:
+            return
+
+        keys = [(f"{scope}:ip:{ip}", self.ip_limit)]
+        if username:
+            keys.append((f"{scope}:user:{username.strip().lower()}", self.username_limit))
+
+        for key, limit in keys:
+            allowed, retry_after = self.backend.hit(key, limit, self.window)
+            if not allowed:
+                raise ThrottleExceeded(key, retry_after)
+
+    @staticmethod
+    def _make_backend(app):
+        name = app.config.get("THROTTLE_BACKEND", "memory")
+        max_keys = app.config.get("THROTTLE_MAX_KEYS", 100000)
+
+        if isinstance(name, ThrottleBackend):
+            return name
+        if name == "memory":
+            return MemoryBackend(max_keys=max_keys)
+        if name == "sqlite":
+            path = app.config.get("THROTTLE_SQLITE_PATH") or os.path.join(
+                app.instance_path, "throttle.db"
+            )
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            return SQLiteBackend(path, max_keys=max_keys)
+        raise ValueError(f"Unknown THROTTLE_BACKEND: {name!r}")
+
+    @staticmethod
+    def _exceeded(error):
+        return (
+            "Too many attempts, please try again later.",
+            429,
+            {"Retry-After": str(error.retry_after)},
+        )
@@ -0,0 +1,93 @@
+import threading
+from collections import OrderedDict
+
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+
+
+class ApiTokens:
+    """Short-lived signed access tokens plus longer-lived refresh tokens.
+
+    Access tokens carry the user's id, username, fullname and token version,
+    so checking one needs no database access. Revocation works through the
+    per-user token version: a password reset bumps it, which is recorded
+    here for this process straight away, and refresh tokens are always
+    checked against the database. Other processes stop accepting old access
+    tokens once they expire (``API_ACCESS_TOKEN_TTL``).
+    """
+
+    ACCESS = "access"
+    REFRESH = "refresh"
+
+    def __init__(self, app=None):
+        self.access_ttl = 900
+        self.refresh_ttl = 30 * 24 * 3600
+        self.max_revocations = 100000
+        self._serializer = None
+        self._revoked_below = OrderedDict()
+        self._lock = threading.Lock()
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        secret = app.config.get("API_TOKEN_SECRET") or app.secret_key
+        if not secret:
+            raise RuntimeError("API tokens need API_TOKEN_SECRET or SECRET_KEY to be set")
+        self._serializer = URLSafeTimedSerializer(secret, salt="api-token")
+        self.access_ttl = app.config.get("API_ACCESS_TOKEN_TTL", 900)
+        self.refresh_ttl = app.config.get("API_REFRESH_TOKEN_TTL", 30 * 24 * 3600)
+        self.max_revocations = app.config.get("API_TOKEN_MAX_REVOCATIONS", 100000)
+
+        app.extensions["api_tokens"] = self
+
+    def issue(self, user):
+        return {
+            "token_type": "Bearer",
+            "access_token": self._serializer.dumps({
+                "typ": self.ACCESS,
+                "uid": user.id,
+                "un": user.username,
+                "fn": user.fullname,
+                "tv": user.token_version,
+            }),
+            "expires_in": self.access_ttl,
+            "refresh_token": self._serializer.dumps({
+                "typ": self.REFRESH,
+                "uid": user.id,
+                "tv": user.token_version,
+            }),
+        }
+
+    def load_access(self, token):
+        """Return the claims of a valid access token, or None. Memory only."""
+        claims = self._load(token, self.ACCESS, self.access_ttl)
+        if claims is None or self._is_revoked(claims["uid"], claims["tv"]):
+            return None
+        return claims
+
+    def load_refresh(self, token):
+        """Return the claims of a well-formed refresh token; the caller checks ``tv`` against the DB."""
+        return self._load(token, self.REFRESH, self.refresh_ttl)
+
+    def revoke(self, user_id, token_version):
+        """Reject tokens for ``user_id`` older than ``token_version`` in this process."""
+        with self._lock:
+            self._revoked_below[user_id] = max(token_version, self._revoked_below.get(user_id, 0))
+            self._revoked_below.move_to_end(user_id)
+            while len(self._revoked_below) > self.max_revocations:
+                self._revoked_below.popitem(last=False)
+
+    def _is_revoked(self, user_id, token_version):
+        with self._lock:
+            return token_version < self._revoked_below.get(user_id, 0)
+
+    def _load(self, token, kind, max_age):
+        if not isinstance(token, str) or not token:
+            return None
+        try:
+            claims = self._serializer.loads(token, max_age=max_age)
+        except BadSignature:
+            return None
+        if not isinstance(claims, dict) or claims.get("typ") != kind:
+            return None
+        return claims
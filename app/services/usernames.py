@@ -0,0 +1,175 @@
+import hashlib
+import logging
+import math
+import threading
+import time
+
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+
+logger = logging.getLogger(__name__)
+
+
+class BloomFilter:
+    def __init__(self, capacity, error_rate=0.01):
+        self.capacity = max(capacity, 1)
+        self.error_rate = error_rate
+        self.size = max(8, int(-self.capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, item):
+        for pos in self._positions(item):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+
+class UsernameIndex:
+    """Answers "is this username free?" mostly from memory.
+
+    A Bloom filter of taken usernames is built from the database at startup
+    and updated on every insert made by this process; a positive answer is
+    confirmed with an indexed lookup. Inserts made by other workers or by
+    ``flask users import`` are only seen after the next rebuild
+    (``USERNAME_INDEX_REFRESH``), so until then a negative answer can be
+    wrong. Treat it as advisory: the unique index on ``username`` decides.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.refresh = 300
+        self.error_rate = 0.01
+        self.min_capacity = 100000
+        self._filter = None
+        self._built_at = 0.0
+        self._rebuilding = False
+        self._pending = None
+        self._lock = threading.Lock()
+        self._stats = self._empty_stats()
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.refresh = app.config.get("USERNAME_INDEX_REFRESH", 300)
+        self.error_rate = app.config.get("USERNAME_INDEX_ERROR_RATE", 0.01)
+        self.min_capacity = app.config.get("USERNAME_INDEX_CAPACITY", 100000)
+        self._filter = None
+
+        app.extensions["username_index"] = self
+        if app.config.get("USERNAME_INDEX_PRELOAD", True):
+            self.rebuild()
+
+    def rebuild(self):
+        from app.extensions import db
+        from app.models.users import User
+
+        with self._lock:
+            # names inserted while we scan are replayed into the new filter
+            self._pending = []
+        try:
+            with self.app.app_context():
+                total = db.session.scalar(select(db.func.count(User.id))) or 0
+                bloom = BloomFilter(max(self.min_capacity, total * 2), self.error_rate)
+                result = db.session.execute(
+                    select(User.username).execution_options(yield_per=10000)
+                )
+                for (username,) in result:
+                    bloom.add(username)
+                db.session.remove()
+        except SQLAlchemyError as e:
+            # e.g. before the first migration; every check goes to the DB meanwhile
+            logger.warning("username index not built: %s", e)
+            with self._lock:
+                self._pending = None
+                self._built_at = time.monotonic()
+            return False
+
+        with self._lock:
+            for username in self._pending:
+                bloom.add(username)
+            self._pending = None
+            self._filter = bloom
+            self._built_at = time.monotonic()
+            self._stats["rebuilds"] += 1
+        return True
+
+    def add(self, username):
+        with self._lock:
+            if self._filter is not None:
+                self._filter.add(username)
+            if self._pending is not None:
+                self._pending.append(username)
+
+    def might_be_taken(self, username):
+        self._maybe_refresh()
+        bloom = self._filter
+        if bloom is None:
+            return True
+        return username in bloom
+
+    def is_taken(self, username):
+        """Advisory answer; the DB is only asked when the filter can't rule it out."""
+        from app.extensions import db
+        from app.models.users import User
+
+        self._count("checks")
+        if not self.might_be_taken(username):
+            self._count("filter_hits")
+            return False
+
+        self._count("db_checks")
+        taken = db.session.scalar(select(User.id).filter_by(username=username).limit(1)) is not None
+        if not taken:
+            self._count("false_positives")
+        return taken
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            bloom = self._filter
+        stats["entries"] = bloom.count if bloom else 0
+        stats["bytes"] = len(bloom.bits) if bloom else 0
+        return stats
+
+    def _maybe_refresh(self):
+        if not self.refresh or self._rebuilding:
+            return
+        if time.monotonic() - self._built_at < self.refresh:
+            return
+        with self._lock:
+            if self._rebuilding:
+                return
+            self._rebuilding = True
+        threading.Thread(target=self._background_rebuild, daemon=True).start()
+
+    def _background_rebuild(self):
+        try:
+            self.rebuild()
+        finally:
+            self._rebuilding = False
+
+    def _count(self, key):
+        with self._lock:
+            self._stats[key] += 1
+
+    @staticmethod
+    def _empty_stats():
+        return {
+            "checks": 0,
+            "filter_hits": 0,
+            "db_checks": 0,
+            "false_positives": 0,
+            "rebuilds": 0,
+        }
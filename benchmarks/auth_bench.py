@@ -0,0 +1,239 @@
+"""Load benchmark for the auth and profile routes.
+
+Runs entirely offline: the app is built with ``TestConf`` (CSRF off,
+throttling off) against a throwaway SQLite file, seeded with ``--users``
+accounts, and driven in-process by ``--concurrency`` threads, each with its
+own test client and cookie jar.
+
+    python -m benchmarks.auth_bench --users 500 --requests 200 --concurrency 8 \\
+        --output bench.json --compare baseline.json
+"""
+import json
+import os
+import platform
+import queue
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import count
+
+import click
+from sqlalchemy import insert
+from werkzeug.security import generate_password_hash
+
+from app import create_app
+from app.configs import TestConf
+from app.extensions import db, hasher, identity_cache
+from app.models.users import User
+
+PASSWORD = "benchpass1"
+ROUTES = ["signup", "login_ok", "login_fail", "reset", "profile"]
+
+
+def redirects_to(path):
+    return lambda r: r.status_code == 302 and r.headers.get("Location", "").endswith(path)
+
+
+# what a successful request looks like per route; anything else counts as an error
+EXPECTED = {
+    "signup": lambda r: r.status_code == 200 and b"User created." in r.data,
+    "login_ok": redirects_to("/profile"),
+    "login_fail": lambda r: r.status_code == 200,
+    "reset": redirects_to("/auth/login"),
+    "profile": lambda r: r.status_code == 200,
+}
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def seed(app, users):
+    pwhash = generate_password_hash(PASSWORD, app.config["PASSWORD_HASH_METHOD"])
+    rows = [
+        {"username": f"bench{i}", "fullname": f"Bench User {i}", "password": pwhash}
+        for i in range(users)
+    ]
+    with app.app_context():
+        db.create_all()
+        for start in range(0, len(rows), 1000):
+            db.session.execute(insert(User), rows[start:start + 1000])
+        db.session.commit()
+
+
+class Scenario:
+    """Builds one request per call; ``client`` belongs to the calling thread."""
+
+    def __init__(self, users):
+        self.users = users
+        self._signups = count()
+        self._lock = threading.Lock()
+
+    def username(self, n):
+        return f"bench{n % self.users}"
+
+    def next_signup(self):
+        with self._lock:
+            # usernames must be 5 to 10 characters
+            return f"new{next(self._signups):05d}"
+
+    def signup(self, client, n):
+        username = self.next_signup()
+        return client.post("/signup", data={
+            "username": username,
+            "fullname": f"New User {username}",
+            "password": PASSWORD,
+            "confirm": PASSWORD,
+            "agreement": "y",
+        })
+
+    def login_ok(self, client, n):
+        return client.post("/auth/login", data={"username": self.username(n), "password": PASSWORD})
+
+    def login_fail(self, client, n):
+        return client.post("/auth/login", data={"username": self.username(n), "password": "wrong-password"})
+
+    def reset(self, client, n):
+        # reset to the same password so login_ok keeps working
+        return client.post("/auth/reset", data={
+            "username": self.username(n),
+            "new_password": PASSWORD,
+            "confirm_password": PASSWORD,
+        })
+
+    def profile(self, client, n):
+        return client.get("/profile")
+
+
+def run_route(app, scenario, route, requests, concurrency):
+    action = getattr(scenario, route)
+    expected = EXPECTED[route]
+    latencies, errors = [], 0
+    lock = threading.Lock()
+    local = threading.local()
+
+    # one client (and cookie jar) per thread, logged in up front for profile
+    idle = queue.SimpleQueue()
+    for n in range(concurrency):
+        c = app.test_client()
+        if route == "profile":
+            c.post("/auth/login", data={"username": scenario.username(n), "password": PASSWORD})
+        idle.put(c)
+
+    def client():
+        if not hasattr(local, "client"):
+            local.client = idle.get()
+        return local.client
+
+    def one(n):
+        nonlocal errors
+        c = client()
+        started = time.perf_counter()
+        response = action(c, n)
+        elapsed = (time.perf_counter() - started) * 1000
+        with lock:
+            latencies.append(elapsed)
+            if not expected(response):
+                errors += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(requests)))
+    wall = time.perf_counter() - started
+
+    return {
+        "requests": requests,
+        "errors": errors,
+        "throughput_rps": requests / wall if wall else 0.0,
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+        "max_ms": max(latencies) if latencies else 0.0,
+    }
+
+
+def compare(results, baseline, threshold):
+    regressions = []
+    click.echo(f"\n{'route':<12}{'rps':>12}{'Δ':>9}{'p95 ms':>12}{'Δ':>9}")
+    for route, current in results["routes"].items():
+        before = baseline.get("routes", {}).get(route)
+        if not before:
+            continue
+        rps_delta = (current["throughput_rps"] - before["throughput_rps"]) / (before["throughput_rps"] or 1)
+        p95_delta = (current["p95_ms"] - before["p95_ms"]) / (before["p95_ms"] or 1)
+        click.echo(
+            f"{route:<12}{current['throughput_rps']:>12.1f}{rps_delta:>+9.1%}"
+            f"{current['p95_ms']:>12.2f}{p95_delta:>+9.1%}"
+        )
+        if rps_delta < -threshold or p95_delta > threshold:
+            regressions.append(route)
+    return regressions
+
+
+@click.command()
+@click.option("--users", type=int, default=200, show_default=True, help="Accounts to seed.")
+@click.option("--requests", "requests_", type=int, default=200, show_default=True, help="Requests per route.")
+@click.option("--concurrency", type=int, default=8, show_default=True)
+@click.option("--route", "routes", multiple=True, type=click.Choice(ROUTES), help="Limit to these routes.")
+@click.option("--hash-pool-size", type=int, default=None, help="Override HASH_POOL_SIZE.")
+@click.option("--output", type=click.Path(dir_okay=False), default=None, help="Write results as JSON.")
+@click.option("--compare", "baseline_path", type=click.Path(exists=True, dir_okay=False), default=None, help="Baseline JSON to compare with.")
+@click.option("--threshold", type=float, default=0.10, show_default=True, help="Allowed relative regression.")
+def main(users, requests_, concurrency, routes, hash_pool_size, output, baseline_path, threshold):
+    with tempfile.TemporaryDirectory() as tmp:
+        class BenchConf(TestConf):
+            SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+            # hashing alone takes longer than the default threshold
+            METRICS_SLOW_REQUEST_MS = float("inf")
+            if hash_pool_size is not None:
+                HASH_POOL_SIZE = hash_pool_size
+
+        app = create_app(BenchConf)
+        seed(app, users)
+        scenario = Scenario(users)
+
+        results = {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "cpus": os.cpu_count(),
+            "users": users,
+            "concurrency": concurrency,
+            "hash_method": app.config["PASSWORD_HASH_METHOD"],
+            "hash_pool_size": app.config["HASH_POOL_SIZE"],
+            "routes": {},
+        }
+
+        click.echo(f"{'route':<12}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}")
+        for route in routes or ROUTES:
+            hasher.reset_stats()
+            identity_cache.reset_stats()
+            stats = run_route(app, scenario, route, requests_, concurrency)
+            results["routes"][route] = stats
+            click.echo(
+                f"{route:<12}{stats['throughput_rps']:>10.1f}{stats['p50_ms']:>10.2f}"
+                f"{stats['p95_ms']:>10.2f}{stats['p99_ms']:>10.2f}{stats['errors']:>8}"
+            )
+
+        hasher.shutdown()
+
+    if output:
+        with open(output, "w") as f:
+            json.dump(results, f, indent=2)
+        click.echo(f"\nResults written to {output}")
+
+    if baseline_path:
+        with open(baseline_path) as f:
+            regressions = compare(results, json.load(f), threshold)
+        if regressions:
+            click.echo(f"\nRegressed beyond {threshold:.0%}: {', '.join(regressions)}", err=True)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Concurrency check for the database engine profile.
+
+Hammers a throwaway SQLite file with concurrent signups and password
+resets from several threads and counts failed requests (``database is
+locked`` surfaces as a 500). Run it against the production profile and
+against the bare defaults to compare:
+
+    python -m benchmarks.concurrent_writes --profile prod
+    python -m benchmarks.concurrent_writes --profile default
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import click
+from sqlalchemy import text
+
+from app import create_app
+from app.configs import ProdConf, TestConf
+from app.extensions import db, hasher
+
+PASSWORD = "benchpass1"
+
+
+def make_conf(profile, path, replica_path):
+    class ConcurrencyConf(TestConf):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{path}"
+        HASH_POOL_SIZE = 0
+        PASSWORD_HASH_METHOD = "pbkdf2:sha256:1000"
+        PROPAGATE_EXCEPTIONS = False
+
+    if profile == "prod":
+        ConcurrencyConf.SQLALCHEMY_ENGINE_OPTIONS = ProdConf.SQLALCHEMY_ENGINE_OPTIONS
+        ConcurrencyConf.SQLITE_PRAGMAS = ProdConf.SQLITE_PRAGMAS
+        if replica_path:
+            ConcurrencyConf.SQLALCHEMY_BINDS = {
+                "replica": {"url": f"sqlite:///{replica_path}", **ProdConf.SQLALCHEMY_ENGINE_OPTIONS},
+            }
+    return ConcurrencyConf
+
+
+@click.command()
+@click.option("--profile", type=click.Choice(["prod", "default"]), default="prod", show_default=True)
+@click.option("--threads", type=int, default=16, show_default=True)
+@click.option("--requests", "requests_", type=int, default=400, show_default=True)
+@click.option("--replica", is_flag=True, help="Route reads to a second SQLite file (a copy of the primary).")
+def main(profile, threads, requests_, replica):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "primary.db")
+        replica_path = os.path.join(tmp, "replica.db") if replica else None
+        app = create_app(make_conf(profile, path, replica_path))
+
+        with app.app_context():
+            db.create_all()
+            journal = db.session.execute(text("PRAGMA journal_mode")).scalar()
+            if replica_path:
+                db.session.remove()
+                db.engine.dispose()
+                shutil.copy(path, replica_path)
+
+        def one(n):
+            client = app.test_client()
+            if n % 2 == 0:
+                response = client.post("/signup", data={
+                    "username": f"c{n}",
+                    "fullname": f"Concurrent {n}",
+                    "password": PASSWORD,
+                    "confirm": PASSWORD,
+                    "agreement": "y",
+                })
+            else:
+                target = f"c{n - 1}"
+                response = client.post("/auth/reset", data={
+                    "username": target,
+                    "new_password": PASSWORD,
+                    "confirm_password": PASSWORD,
+                })
+            return response.status_code
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            statuses = list(pool.map(one, range(requests_)))
+        elapsed = time.perf_counter() - started
+        hasher.shutdown()
+
+    failed = sum(1 for s in statuses if s >= 500)
+    click.echo(
+        f"profile={profile} journal_mode={journal} threads={threads}: "
+        f"{requests_} requests in {elapsed:.2f}s ({requests_ / elapsed:.0f} req/s), {failed} failed"
+    )
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,63 @@
-from app import create_app
+import logging
+import os
+
+import click
+from dotenv import dotenv_values
+
+
+def create_app(config=None):
+    # imported here so `serve` can survive a reload into code that doesn't import
+    from app import create_app
+
+    return create_app(config)
+
+
+@click.group(invoke_without_command=True)
+@click.pass_context
+def cli(ctx):
+    """Without a command, start the debug server."""
+    if ctx.invoked_subcommand is None:
+        app = create_app()
+        app.run(debug=True, host="127.0.0.1", port=5000)
+
+
+@cli.command()
+@click.option("--host", default=lambda: os.getenv("HOST", "127.0.0.1"), show_default="$HOST or 127.0.0.1")
+@click.option("--port", type=int, default=lambda: int(os.getenv("FLASK_PORT", 5000)), show_default="$FLASK_PORT or 5000")
+@click.option("--workers", type=int, default=lambda: int(os.getenv("WEB_WORKERS", 0)), help="0 means one per core.")
+@click.option("--threads", type=int, default=lambda: int(os.getenv("WEB_THREADS", 16)), show_default="$WEB_THREADS or 16",
+              help="Connections each worker serves at once.")
+@click.option("--graceful-timeout", type=float, default=30, show_default=True,
+              help="Seconds a draining worker gets before it is killed.")
+def serve(host, port, workers, threads, graceful_timeout):
+    """Serve with preforked workers sharing one preloaded app.
+
+    SIGHUP re-execs the server to pick up new code and .env; SIGTERM drains it.
+    """
+    from prefork import PreforkServer
+
+    logging.basicConfig(level=logging.INFO, format="[%(process)d] %(levelname)s %(message)s")
+    # the re-exec has to read .env afresh, so leave out what came from it
+    dotenv = dotenv_values()
+    exec_env = {k: v for k, v in os.environ.items() if dotenv.get(k) != v}
+
+    # the debugger and reloader don't survive a fork
+    os.environ["FLASK_DEBUG"] = "0"
+    workers = workers or os.cpu_count() or 1
+
+    def preload():
+        from app.configs import ProdConf
+
+        class ServeConf(ProdConf):
+            # the workers share the cores, so each one gets a slice of the hash pool
+            HASH_POOL_SIZE = int(os.getenv("HASH_POOL_SIZE", max(1, (os.cpu_count() or 1) // workers)))
+            HASH_QUEUE_SIZE = int(os.getenv("HASH_QUEUE_SIZE", HASH_POOL_SIZE * 4))
+
+        return create_app(ServeConf)
+
+    PreforkServer(preload, host=host, port=port, workers=workers,
+                  threads=threads, graceful_timeout=graceful_timeout, exec_env=exec_env).run()
+
 
 if __name__ == "__main__":
-    app = create_app()
-    app.run(debug=True, host="127.0.0.1", port=5000)
\ No newline at end of file
+    cli()
@@ -0,0 +1,32 @@
+"""Widen users.password for modern hash formats
+
+Revision ID: 2da22e892c7d
+Revises: ba11af34067b
+Create Date: 2026-10-17 09:12:31.402118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2da22e892c7d'
+down_revision = 'ba11af34067b'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.alter_column('password',
+               existing_type=sa.String(length=128),
+               type_=sa.String(length=256),
+               existing_nullable=False)
+
+
+def downgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.alter_column('password',
+               existing_type=sa.String(length=256),
+               type_=sa.String(length=128),
+               existing_nullable=False)
@@ -0,0 +1,26 @@
+"""Add users.token_version for API token revocation
+
+Revision ID: e1a1ca08547f
+Revises: 2da22e892c7d
+Create Date: 2026-10-17 14:40:07.215934
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e1a1ca08547f'
+down_revision = '2da22e892c7d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('token_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_column('token_version')
@@ -0,0 +1,351 @@
+import errno
+import gc
+import logging
+import os
+import select
+import signal
+import socket
+import socketserver
+import sys
+import threading
+import time
+
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler
+
+logger = logging.getLogger(__name__)
+
+# handed from a master to the one it re-execs into on SIGHUP
+LISTEN_FD_ENV = "PREFORK_LISTEN_FD"
+OLD_WORKERS_ENV = "PREFORK_OLD_WORKERS"
+
+# a worker that dies sooner than this after being forked counts as a crash
+MIN_UPTIME = 1.0
+MAX_BACKOFF = 30.0
+
+
+class _RequestHandler(WSGIRequestHandler):
+    def handle_one_request(self):
+        super().handle_one_request()
+        if self.server.draining:
+            # don't hold a keep-alive connection open past a drain
+            self.close_connection = True
+
+
+class _WorkerServer(socketserver.ThreadingMixIn, BaseWSGIServer):
+    """Werkzeug's WSGI server with at most ``threads`` connections at a time."""
+
+    multithread = True
+    # server_close() joins the request threads, i.e. waits for in-flight requests
+    daemon_threads = False
+    draining = False
+
+    def __init__(self, *args, threads, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._slots = threading.BoundedSemaphore(threads)
+        # other workers accept on the same socket, so a wake-up may find
+        # nothing to accept; that must not block the serve loop
+        self.socket.setblocking(False)
+
+    def get_request(self):
+        # wait for a free thread before taking a connection, so a busy
+        # worker leaves new ones in the backlog for the others
+        self._slots.acquire()
+        try:
+            if self.draining:
+                raise BlockingIOError(errno.EAGAIN, "draining")
+            return super().get_request()
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def process_request_thread(self, request, client_address):
+        try:
+            super().process_request_thread(request, client_address)
+        finally:
+            self._slots.release()
+
+
+class PreforkServer:
+    """Serves one preloaded app from several forked worker processes.
+
+    The master binds the socket and calls ``app_factory`` once, so every
+    worker starts from the same copy-on-write memory (templates, username
+    index, asset manifest) and accepts on the same socket. Workers that die
+    are restarted. SIGHUP re-execs the master, which keeps its pid and the
+    socket, loads the current code and ``.env`` and drains the old workers
+    once the new ones are up. SIGTERM and SIGINT drain the workers and exit.
+
+    ``app_factory`` should import the app itself: an import error in new
+    code is then a failed load, and the old workers keep serving.
+    """
+
+    def __init__(self, app_factory, host="127.0.0.1", port=5000, workers=None, threads=16,
+                 graceful_timeout=30, keepalive=5, backlog=1024, exec_env=None):
+        self.app_factory = app_factory
+        self.host = host
+        self.port = port
+        self.num_workers = workers or os.cpu_count() or 1
+        self.threads = threads
+        self.graceful_timeout = graceful_timeout
+        self.keepalive = keepalive
+        self.backlog = backlog
+        # environment for the SIGHUP re-exec, defaults to the current one
+        self.exec_env = exec_env
+        self.app = None
+        self.socket = None
+        self.workers = {}  # pid -> forked at
+        self._old_workers = set()
+        self._retiring = {}  # old worker pid -> kill deadline
+        self._signals = []
+        self._stopping = False
+        self._backoff = 0.0
+        self._spawn_after = 0.0
+        self._boot_started = None
+        self._ready = 0
+
+    # Master
+
+    def run(self):
+        self._boot_started = time.perf_counter()
+        self.socket = self._listen()
+        self._old_workers = {
+            int(pid) for pid in os.environ.pop(OLD_WORKERS_ENV, "").split(",") if pid
+        }
+
+        self._wake_r, self._wake_w = self._pipe()
+        self._ready_r, self._ready_w = self._pipe()
+        signal.set_wakeup_fd(self._wake_w)
+        for sig in (signal.SIGHUP, signal.SIGTERM, signal.SIGINT, signal.SIGCHLD):
+            signal.signal(sig, self._on_signal)
+
+        self.app = self._load()
+        if self.app is None:
+            if not self._old_workers:
+                raise RuntimeError("app could not be loaded")
+            logger.warning("keeping the %d running workers; fix the app and send SIGHUP again",
+                           len(self._old_workers))
+
+        logger.info(
+            "master %d listening on http://%s:%d with %d workers of %d threads",
+            os.getpid(), self.host, self.socket.getsockname()[1], self.num_workers, self.threads,
+        )
+        try:
+            self._loop()
+        finally:
+            self.socket.close()
+        logger.info("master %d exiting", os.getpid())
+
+    def _listen(self):
+        fd = os.environ.pop(LISTEN_FD_ENV, None)
+        if fd is not None:
+            sock = socket.socket(fileno=int(fd))
+        else:
+            family = socket.AF_INET6 if ":" in self.host else socket.AF_INET
+            sock = socket.create_server((self.host, self.port), family=family, backlog=self.backlog)
+        sock.set_inheritable(True)
+        return sock
+
+    def _loop(self):
+        while True:
+            self._reap()
+            while self._signals:
+                sig = self._signals.pop(0)
+                if sig in (signal.SIGTERM, signal.SIGINT):
+                    self._stop()
+                    return
+                if sig == signal.SIGHUP:
+                    self._reexec()
+            self._spawn_missing()
+            self._kill_overdue()
+
+            timeout = max(self._spawn_after - time.monotonic(), 0) if self._missing() else 1.0
+            try:
+                readable, _, _ = select.select([self._wake_r, self._ready_r], [], [], timeout)
+            except InterruptedError:
+                continue
+            if self._ready_r in readable:
+                self._on_ready(os.read(self._ready_r, 4096))
+            if self._wake_r in readable:
+                os.read(self._wake_r, 4096)
+
+    def _load(self):
+        started = time.perf_counter()
+        try:
+            app = self.app_factory()
+        except Exception:
+            logger.exception("loading the app failed")
+            return None
+        # objects that exist now are never written to by the collector
+        # again, so their pages stay shared with the workers
+        gc.collect()
+        gc.freeze()
+        logger.info("app loaded in %.0f ms", (time.perf_counter() - started) * 1000)
+        return app
+
+    def _reexec(self):
+        # exec keeps the pid, so the running workers stay our children and
+        # keep serving until the new image has its own workers up
+        logger.info("reloading: re-executing the master")
+        env = dict(os.environ if self.exec_env is None else self.exec_env)
+        env[LISTEN_FD_ENV] = str(self.socket.fileno())
+        # everything still alive: current workers, workers kept after a
+        # failed reload, and old ones that haven't finished draining
+        pids = set(self.workers) | self._old_workers | set(self._retiring)
+        env[OLD_WORKERS_ENV] = ",".join(str(pid) for pid in sorted(pids))
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os.execve(sys.executable, sys.orig_argv, env)
+
+    def _stop(self):
+        self._stopping = True
+        pids = list(self.workers) + list(self._old_workers)
+        logger.info("draining %d workers", len(pids))
+        for pid in pids:
+            self._kill(pid, signal.SIGTERM)
+
+        deadline = time.monotonic() + self.graceful_timeout
+        while (self.workers or self._old_workers) and time.monotonic() < deadline:
+            self._reap()
+            time.sleep(0.05)
+        for pid in list(self.workers) + list(self._old_workers):
+            logger.warning("worker %d did not drain in time, killing it", pid)
+            self._kill(pid, signal.SIGKILL)
+        while self.workers or self._old_workers:
+            self._reap()
+            time.sleep(0.05)
+
+    def _reap(self):
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                self._old_workers.clear()
+                return
+            if pid == 0:
+                return
+            code = os.waitstatus_to_exitcode(status)
+            self._retiring.pop(pid, None)
+            if pid in self._old_workers:
+                self._old_workers.discard(pid)
+                logger.info("old worker %d exited (%d)", pid, code)
+                continue
+            forked_at = self.workers.pop(pid, None)
+            if forked_at is None:
+                continue
+            if self._stopping:
+                logger.info("worker %d exited (%d)", pid, code)
+                continue
+
+            logger.warning("worker %d exited (%d), restarting", pid, code)
+            if time.monotonic() - forked_at < MIN_UPTIME:
+                self._backoff = min(max(self._backoff * 2, 0.5), MAX_BACKOFF)
+                self._spawn_after = time.monotonic() + self._backoff
+            else:
+                self._backoff = 0.0
+
+    def _kill_overdue(self):
+        now = time.monotonic()
+        for pid, deadline in list(self._retiring.items()):
+            if now >= deadline:
+                logger.warning("worker %d did not drain in time, killing it", pid)
+                self._kill(pid, signal.SIGKILL)
+                del self._retiring[pid]
+
+    def _missing(self):
+        if self.app is None:
+            return 0
+        return self.num_workers - len(self.workers)
+
+    def _spawn_missing(self):
+        if time.monotonic() < self._spawn_after:
+            return
+        for _ in range(self._missing()):
+            pid = os.fork()
+            if pid == 0:
+                self._run_worker()
+            self.workers[pid] = time.monotonic()
+
+    def _on_ready(self, data):
+        if self._ready >= self.num_workers:
+            return
+        self._ready += len(data)
+        if self._ready >= self.num_workers:
+            logger.info(
+                "%d workers ready in %.0f ms",
+                self.num_workers, (time.perf_counter() - self._boot_started) * 1000,
+            )
+            # the new workers are accepting, so the old ones can go
+            for pid in self._old_workers:
+                self._kill(pid, signal.SIGTERM)
+                self._retiring[pid] = time.monotonic() + self.graceful_timeout
+
+    def _on_signal(self, signum, frame):
+        if signum != signal.SIGCHLD:
+            self._signals.append(signum)
+
+    def _kill(self, pid, sig):
+        try:
+            os.kill(pid, sig)
+        except ProcessLookupError:
+            pass
+
+    @staticmethod
+    def _pipe():
+        r, w = os.pipe()
+        os.set_blocking(r, False)
+        os.set_blocking(w, False)
+        return r, w
+
+    # Worker
+
+    def _run_worker(self):
+        code = 0
+        try:
+            self._serve()
+        except Exception:
+            logger.exception("worker %d crashed", os.getpid())
+            code = 1
+        finally:
+            os._exit(code)
+
+    def _serve(self):
+        forked_at = time.perf_counter()
+        signal.set_wakeup_fd(-1)
+        for sig in (signal.SIGHUP, signal.SIGCHLD, signal.SIGTERM):
+            signal.signal(sig, signal.SIG_DFL)
+        # Ctrl-C reaches the whole process group; the master drains us
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        for fd in (self._wake_r, self._wake_w, self._ready_r):
+            os.close(fd)
+
+        self._after_fork()
+        _RequestHandler.timeout = self.keepalive
+        server = _WorkerServer(
+            self.host, self.port, self.app,
+            handler=_RequestHandler, fd=self.socket.fileno(), threads=self.threads,
+        )
+        self.socket.close()
+
+        def drain(signum, frame):
+            server.draining = True
+            threading.Thread(target=server.shutdown, daemon=True).start()
+
+        signal.signal(signal.SIGTERM, drain)
+        try:
+            os.write(self._ready_w, b"r")
+        except OSError as e:
+            if e.errno != errno.EAGAIN:
+                raise
+        os.close(self._ready_w)
+        logger.info("worker %d ready in %.0f ms", os.getpid(), (time.perf_counter() - forked_at) * 1000)
+
+        server.serve_forever()
+        server.server_close()
+
+    def _after_fork(self):
+        # pooled connections opened in the master must not be shared
+        db = self.app.extensions.get("sqlalchemy")
+        if db is not None:
+            with self.app.app_context():
+                for engine in db.engines.values():
+                    engine.dispose(close=False)